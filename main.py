@@ -1,10 +1,28 @@
 import os
+import sys
 import csv
+import shelve
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests import RequestException
 from tqdm import tqdm
 from function.search import Search
 from function.detail import Detail
 from utils.spider_config import spider_config
 
+log = logging.getLogger('dianping')
+
+# 店铺详情的磁盘缓存，重新运行时跳过已获取的店铺
+DETAIL_CACHE_PATH = './tmp/detail_cache'
+# shelve 不是线程安全的，工作线程访问缓存时需要加锁
+detail_cache_lock = threading.Lock()
+# 详情结果按批写入 CSV 的条数
+CSV_BATCH_SIZE = 100
+# 已提交但未写入的详情任务上限，超过时等待最早的任务完成，避免搜索页远远领先于详情爬取
+MAX_PENDING_DETAILS = 200
+
 # 实例化 Detail 和 Search 类
 d = Detail()
 s = Search()
@@ -17,102 +35,223 @@ def get_search_url(cur_page, city_id, keyword='炸鸡'):
     @param keyword: 搜索关键字 / Search keyword
     @return: 拼接好的搜索URL和一些需要的选项 / Constructed search URL and request type
     """
-    # 使用简单的字符串拼接构建URL / Construct URL using simple string concatenation
-    base_url = f'http://www.dianping.com/search/keyword/{city_id}/0_{keyword}/p'
+    return f'http://www.dianping.com/search/keyword/{city_id}/0_{keyword}/p{cur_page}', 'proxy, cookie'
+
+class CsvSaver():
+    """
+    CSV 保存器，整个爬取过程持有同一个文件句柄和写入器
+    CSV saver holding one file handle and one writer for the whole crawl
+    """
+
+    def __init__(self, file_path):
+        """
+        :param file_path: CSV 文件路径 / CSV file path
+        """
+        self.file_path = file_path
+        # 使用字典作为有序集合存储所有字段名，保持列顺序稳定
+        self.fieldnames = {}
+        # 已写入表头的列顺序
+        self.columns = None
+        self.csvfile = None
+        self.writer = None
+
+    def __enter__(self):
+        # 使用 1MB 写缓冲，由关闭文件或缓冲写满时统一刷盘；读写模式以便出现新字段时重写表头
+        self.csvfile = open(self.file_path, mode='w+', newline='', encoding='utf-8-sig', buffering=2 ** 20)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.csvfile.close()
 
-    # 根据页码构建搜索URL / Construct search URL based on page number
-    if cur_page == 1:
-        return f"{base_url}1", 'proxy, cookie'
-    else:
-        return f"{base_url}{cur_page}", 'proxy, cookie'
+    def initialize_csv(self):
+        """
+        初始化 CSV 写入器，写入表头
+        Create the CSV writer and write the header
+        """
+        self.columns = list(self.fieldnames)
+        self.writer = csv.writer(self.csvfile)
+        self.writer.writerow(self.columns)
+        log.info('CSV 文件 "%s" 已创建并写入表头。', self.file_path)
 
-def initialize_csv(file_path, fieldnames):
+    def extend_csv_header(self):
+        """
+        出现新字段时重写表头，已写入的数据按新表头重新写入，缺失的列留空
+        Rewrite the header when new fields appear, re-writing existing rows under it with missing columns left empty
+        """
+        self.csvfile.seek(0)
+        rows = list(csv.DictReader(self.csvfile))
+        self.csvfile.seek(0)
+        self.csvfile.truncate()
+        self.initialize_csv()
+        self.write_rows(rows)
+
+    def write_rows(self, data):
+        """
+        按表头列顺序将字典转换为行后一次写入，缺失的列留空
+        Convert dicts to rows in header column order and write them in one call, missing columns left empty
+        :param data: 要写入的数据列表，每个元素为字典 / List of data dictionaries to write
+        """
+        columns = self.columns
+        self.writer.writerows([row.get(column, '') for column in columns] for row in data)
+
+    def save_to_csv(self, data):
+        """
+        将数据写入 CSV 文件，首次写入时写入表头，出现新字段时重写表头
+        Write data to the CSV file, writing the header first and rewriting it when new fields appear
+        :param data: 要写入的数据列表，每个元素为字典 / List of data dictionaries to write
+        """
+        if not data:
+            return
+        # 更新字段名集合
+        for row in data:
+            for key in row:
+                self.fieldnames.setdefault(key, None)
+
+        if self.writer is None:
+            self.initialize_csv()
+        elif len(self.fieldnames) != len(self.columns):
+            self.extend_csv_header()
+
+        # 整页一次写入 / Write the whole page in one call
+        self.write_rows(data)
+        log.info('已将 %s 条数据写入 CSV 文件。', len(data))
+
+def fetch_detail(each_search_res, detail_cache):
     """
-    初始化 CSV 文件，写入表头
-    Initialize the CSV file and write the header
-    :param file_path: CSV 文件路径 / CSV file path
-    :param fieldnames: 表头字段名列表 / List of header field names
+    获取单个店铺详情并与搜索结果合并，在线程池中并发执行，已缓存的店铺直接读取缓存
+    Fetch one shop's detail and merge it with the search result, run concurrently in the thread pool,
+    shops already in the cache are read from it
+    :param each_search_res: 搜索页的单条结果 / One search result
+    :param detail_cache: 店铺详情缓存 / Shop detail cache
+    :return: 合并后的结果，失败时返回 None / Combined result, None on failure
     """
-    file_exists = os.path.isfile(file_path)
-    with open(file_path, mode='w', newline='', encoding='utf-8-sig') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        print(f'CSV 文件 "{file_path}" 已创建并写入表头。')
+    shop_id = each_search_res.get('店铺id')
+    try:
+        # 爬取推荐菜
+        if not shop_id:
+            log.warning('未找到店铺ID，跳过该条记录。')
+            return None
+
+        with detail_cache_lock:
+            each_detail_res = detail_cache.get(shop_id)
+
+        if each_detail_res is None:
+            # 获取店铺详情
+            each_detail_res = d.get_detail(shop_id)
+            if not each_detail_res:
+                log.warning('店铺ID %s 的详情获取失败，跳过。', shop_id)
+                return None
+            # 只缓存获取到数据的结果，被 ban 或请求失败时下次重新获取
+            if any(each_detail_res.values()):
+                with detail_cache_lock:
+                    detail_cache[shop_id] = each_detail_res
 
-def save_to_csv(file_path, data, fieldnames):
+        # 合并搜索结果和详情结果
+        return {**each_search_res, **each_detail_res}
+
+    except Exception as e:
+        log.warning('处理店铺ID %s 时发生错误: %s', shop_id, e)
+        return None
+
+def collect_details(pending, saver, detail_bar, keep):
     """
-    将数据写入 CSV 文件
-    Write data to the CSV file
-    :param file_path: CSV 文件路径 / CSV file path
-    :param data: 要写入的数据列表，每个元素为字典 / List of data dictionaries to write
-    :param fieldnames: 表头字段名列表 / List of header field names
+    按提交顺序收集已完成的详情任务，分批写入 CSV
+    Collect finished detail tasks in submission order and write them to the CSV in batches
+    :param pending: 按提交顺序排列的详情任务 / Detail futures in submission order
+    :param saver: CSV 保存器 / CSV saver
+    :param detail_bar: 详情爬取进度条 / Detail progress bar
+    :param keep: 最多保留的未完成任务数，超过时阻塞等待最早的任务 / Max unfinished tasks to keep, blocks on the oldest beyond it
     """
-    with open(file_path, mode='a', newline='', encoding='utf-8-sig') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
-        for row in data:
-            writer.writerow(row)
-    print(f'已将 {len(data)} 条数据写入 CSV 文件。')
+    batch = []
+    try:
+        while pending and (pending[0].done() or len(pending) > keep):
+            combined_res = pending.popleft().result()
+            detail_bar.update(1)
+            if combined_res is not None:
+                batch.append(combined_res)
+            if len(batch) >= CSV_BATCH_SIZE:
+                saver.save_to_csv(batch)
+                batch = []
+    finally:
+        # 任务抛出异常时也保存已收集的结果
+        saver.save_to_csv(batch)
+
+def collect_finished_details(pending, saver, detail_bar):
+    """
+    程序中止时只收集已完成的详情任务写入 CSV，未开始的任务已被取消
+    On abort, write only detail tasks that already finished, the ones not started have been cancelled
+    :param pending: 按提交顺序排列的详情任务 / Detail futures in submission order
+    :param saver: CSV 保存器 / CSV saver
+    :param detail_bar: 详情爬取进度条 / Detail progress bar
+    """
+    batch = []
+    for future in pending:
+        if not future.done() or future.cancelled() or future.exception() is not None:
+            continue
+        detail_bar.update(1)
+        combined_res = future.result()
+        if combined_res is not None:
+            batch.append(combined_res)
+    pending.clear()
+    saver.save_to_csv(batch)
 
 def main():
+    # 日志只配置一次，调高级别即可关闭热路径上的输出
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+
     # 定义 CSV 文件路径
     csv_file = 'salad_taiwan.csv'
 
-    # 初始化一个集合来存储所有字段名
-    fieldnames_set = set()
-
-    # 开始爬取
-    for page in tqdm(range(1, spider_config.NEED_SEARCH_PAGES + 1), desc='搜索页数'):
-        search_url, request_type = get_search_url(page, spider_config.LOCATION_ID, spider_config.KEYWORD)
-        search_res = s.search(search_url, request_type)
-        
-        if not search_res:
-            print(f'第 {page} 页没有搜索结果，停止爬取。')
-            break
-
-        print(f'第 {page} 页搜索结果：{search_res}')
-
-        # 初始化一个列表来存储当前页的所有数据
-        page_data = []
-
-        for each_search_res in tqdm(search_res, desc='详细爬取', leave=False):
-            try:
-                # 爬取推荐菜
-                shop_id = each_search_res.get('店铺id')
-                if not shop_id:
-                    print('未找到店铺ID，跳过该条记录。')
-                    continue
-
-                # 获取店铺详情
-                each_detail_res = d.get_detail(shop_id)
-                if not each_detail_res:
-                    print(f'店铺ID {shop_id} 的详情获取失败，跳过。')
-                    continue
-
-                # 合并搜索结果和详情结果
-                combined_res = {**each_search_res, **each_detail_res}
-                page_data.append(combined_res)
-
-                # 更新字段名集合
-                fieldnames_set.update(combined_res.keys())
-
-            except Exception as e:
-                print(f'处理店铺ID {shop_id} 时发生错误: {e}')
-                continue
-
-        # 如果这是第一次获取字段名，初始化 CSV 文件
-        if page == 1:
-            # 可选择在此处手动排序 fieldnames
-            fieldnames = list(fieldnames_set)
-            initialize_csv(csv_file, fieldnames)
-
-        # 将当前页的数据写入 CSV
-        if page_data:
-            save_to_csv(csv_file, page_data, fieldnames)
-
-        # 如果当前页的结果少于预期数量，可能表示没有更多数据，停止爬取
-        if len(search_res) < 15:
-            print(f'第 {page} 页的数据少于预期，停止爬取。')
-            break
+    os.makedirs(os.path.dirname(DETAIL_CACHE_PATH), exist_ok=True)
+
+    # 整个爬取过程只打开一次 CSV 文件、详情缓存和线程池
+    # 搜索页在主线程中逐页获取，店铺详情提交到线程池后立即获取下一页，不必等待当前页详情完成
+    with CsvSaver(csv_file) as saver, shelve.open(DETAIL_CACHE_PATH) as detail_cache, \
+            ThreadPoolExecutor(max_workers=spider_config.CONCURRENCY) as executor:
+        pending = deque()
+        detail_bar = tqdm(total=0, desc='详细爬取')
+
+        try:
+            # 开始爬取
+            for page in tqdm(range(1, spider_config.NEED_SEARCH_PAGES + 1), desc='搜索页数'):
+                search_url, request_type = get_search_url(page, spider_config.LOCATION_ID, spider_config.KEYWORD)
+                try:
+                    search_res = s.search(search_url, request_type)
+                except RequestException as e:
+                    # 代理重试次数耗尽，停止爬取，已完成的详情会被保存
+                    log.error('Proxy retries exhausted, stopping the crawl: %s', e)
+                    log.error('代理重试次数已用尽，停止爬取：%s', e)
+                    sys.exit()
+
+                if not search_res:
+                    log.warning('第 %s 页没有搜索结果，停止爬取。', page)
+                    break
+
+                log.debug('第 %s 页搜索结果：%s', page, search_res)
+
+                # 提交当前页所有店铺的详情任务
+                pending.extend(executor.submit(fetch_detail, each_search_res, detail_cache)
+                               for each_search_res in search_res)
+                detail_bar.total += len(search_res)
+                detail_bar.refresh()
+
+                # 写入已完成的详情，积压过多时等待
+                collect_details(pending, saver, detail_bar, keep=MAX_PENDING_DETAILS)
+
+                # 如果当前页的结果少于预期数量，可能表示没有更多数据，停止爬取
+                if len(search_res) < 15:
+                    log.warning('第 %s 页的数据少于预期，停止爬取。', page)
+                    break
+        except BaseException:
+            # 搜索页被 ban、工作线程退出或 Ctrl-C 时，取消未开始的详情任务，只保存已完成的结果
+            executor.shutdown(wait=False, cancel_futures=True)
+            collect_finished_details(pending, saver, detail_bar)
+            detail_bar.close()
+            raise
+
+        # 等待剩余的详情任务并写入
+        collect_details(pending, saver, detail_bar, keep=0)
+        detail_bar.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
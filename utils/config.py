@@ -41,6 +41,9 @@ class Config(object):
     def getRaw(self, section, name):
         return self._configRaw.get(section, name)
 
+    def has_option(self, section, name):
+        return self._configRaw.has_option(section, name)
+
 
 global_config = Config('./config.ini')
 require_config = Config('./require.ini')
@@ -20,12 +20,42 @@
 
 """
 
+import os
 import json
+import pickle
+import hashlib
+from functools import lru_cache
 
+# 字体映射的 pickle 缓存目录
+CACHE_DIR = './tmp/font_cache'
 
+
+def get_cache_path(filename):
+    """
+    获取映射文件对应的 pickle 缓存路径，文件修改后缓存自动失效
+    :param filename:
+    :return:
+    """
+    key = f'{os.path.abspath(filename)}:{os.path.getmtime(filename)}'
+    return os.path.join(CACHE_DIR, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.pkl')
+
+
+@lru_cache(maxsize=64)
 def get_map(filename='font_map.json'):
+    cache_path = get_cache_path(filename)
+    if os.path.exists(cache_path):
+        with open(cache_path, 'rb') as f:
+            return pickle.load(f)
+
     with open(filename, 'r', encoding='utf-8') as f:
         key_map = json.load(f)
+
+    # 先写临时文件再替换，避免多线程同时写入时读到不完整的缓存
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f'{cache_path}.{os.getpid()}.{id(key_map)}'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(key_map, f)
+    os.replace(tmp_path, cache_path)
     return key_map
 
 
@@ -1,9 +1,15 @@
 import os
+import re
 import sys
 import time
 import json
+import random
+import logging
+import threading
 import requests
-from tqdm import tqdm
+from collections import deque
+from http.cookiejar import DefaultCookiePolicy
+from requests.adapters import HTTPAdapter
 from faker import Factory
 
 from utils.cache import cache
@@ -11,6 +17,8 @@ from utils.config import global_config
 from utils.get_file_map import get_map
 from utils.spider_config import spider_config
 
+log = logging.getLogger('dianping')
+
 
 class RequestsUtils():
     """
@@ -31,10 +39,24 @@ class RequestsUtils():
         # Ensure User-Agent is not empty
         # 确保 User-Agent 不为空
         if self.ua is None:
-            print('User-Agent cannot be empty.')
-            print('User-Agent 不能为空。')
+            log.error('User-Agent cannot be empty.')
+            log.error('User-Agent 不能为空。')
             sys.exit()
 
+        # Precompute the request headers
+        # 预先构建请求头
+        self.build_headers()
+
+        # Shared session so connections to the same host are reused across requests
+        # 共享会话，复用到同一主机的连接
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # Cookies are always sent explicitly in headers, never stored from responses
+        # cookie 始终通过请求头显式发送，不保存响应中的 cookie
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
         # Determine if a cookie pool is being used
         # 判断是否使用 cookie 池
         self.cookie_pool = spider_config.USE_COOKIE_POOL
@@ -43,7 +65,7 @@ class RequestsUtils():
         # 判断是否使用代理
         self.ip_proxy = spider_config.USE_PROXY
         if self.ip_proxy:
-            self.proxy_pool = []  # Initialize proxy pool if proxies are used
+            self.proxy_pool = deque()  # Initialize proxy pool if proxies are used
             # 如果使用代理，则初始化代理池
 
         # Parse the request times for implementing sleep intervals
@@ -51,12 +73,26 @@ class RequestsUtils():
         try:
             self.stop_times = self.parse_stop_time(requests_times)
         except:
-            print('Error parsing requests_times in configuration. Please ensure correct input format (use English punctuation).')
-            print('配置文件中的 requests_times 解析错误。请确保输入格式正确（使用英文标点）。')
+            log.error('Error parsing requests_times in configuration. Please ensure correct input format (use English punctuation).')
+            log.error('配置文件中的 requests_times 解析错误。请确保输入格式正确（使用英文标点）。')
             sys.exit()
         self.global_time = 0  # Initialize global request counter
         # 初始化全局请求计数器
 
+        # Lock shared by worker threads so the anti-ban counter and proxy pool stay consistent
+        # 多个工作线程共享的锁，保证防封禁计数器和代理池的一致性
+        self.lock = threading.Lock()
+
+        # Separate lock so only one thread prompts for verification, and a counter of solved checks
+        # so threads whose request was sent before the check was solved just retry without prompting
+        # 单独的验证锁，保证只有一个线程提示验证；已完成验证次数的计数，验证完成前发出的请求直接重试而不再提示
+        self.verify_lock = threading.Lock()
+        self.verify_round = 0
+
+        # Cache of decrypt patterns and mappings, keyed by (page kind, font_id, font_path)
+        # 解密正则与映射的缓存，键为 (页面类型, font_id, font_path)
+        self._replace_cache = {}
+
     def create_dir(self, file_name):
         """
         Create a directory if it does not exist.
@@ -68,10 +104,10 @@ class RequestsUtils():
         if not os.path.exists(file_name):
             os.mkdir(file_name)
             # 创建目录
-            print(f'Directory "{file_name}" created.')
+            log.debug('Directory "%s" created.', file_name)
             # 输出目录创建信息
         else:
-            print(f'Directory "{file_name}" already exists.')
+            log.debug('Directory "%s" already exists.', file_name)
             # 输出目录已存在的信息
 
     def parse_stop_time(self, requests_times):
@@ -81,17 +117,15 @@ class RequestsUtils():
         
         :param requests_times: A string with format 'request_count,sleep_time;...'
                               格式为 '请求次数,休眠时间;...' 的字符串。
-        :return: A list of [request_count, sleep_time] pairs.
-                 返回一个包含 [请求次数, 休眠时间] 对的列表。
+        :return: A list of (request_count, sleep_time) integer tuples.
+                 返回一个包含 (请求次数, 休眠时间) 整数元组的列表。
         """
         each_stop = requests_times.strip(';').split(';')  # Remove trailing semicolon and split
         # 移除末尾的分号并进行分割
-        stop_time = []
-        for i in range(len(each_stop) - 1, -1, -1):
-            stop_time.append(each_stop[i].split(','))  # Split each pair and add to the list
-            # 分割每一对并添加到列表中
-        return stop_time  # Returns a list in reverse order for priority handling
-        # 返回一个反向的列表以便优先处理
+        # Split each pair into integers, in reverse order for priority handling
+        # 将每一对转换为整数，反向排列以便优先处理
+        return [(int(request_count), int(sleep_duration))
+                for request_count, sleep_duration in (pair.split(',') for pair in reversed(each_stop))]
 
     def get_requests(self, url, request_type):
         """
@@ -117,10 +151,14 @@ class RequestsUtils():
         assert request_type in valid_request_types, f"Invalid request_type: {request_type}"
         # 如果 request_type 无效，则抛出断言错误
 
+        # Remember which verification round this request belongs to
+        # 记录本次请求发出时的验证轮次
+        verify_round = self.verify_round
+
         # Requests without headers (e.g., font file downloads) are not counted in the anti-ban statistics
         # 不带请求头的请求（例如字体文件下载）不计入防封禁统计
         if request_type == 'no header':
-            r = requests.get(url=url)
+            r = self.session.get(url=url)
             return r
             # 直接发起请求并返回响应
 
@@ -133,17 +171,17 @@ class RequestsUtils():
             if request_type == 'no proxy, no cookie':
                 # Make a request without cookies
                 # 发起不带 cookie 的请求
-                r = requests.get(url, headers=self.get_header(cookie=None, need_cookie=False))
+                r = self.session.get(url, headers=self.get_header(cookie=None, need_cookie=False))
 
             elif request_type == 'no proxy, cookie':
                 # Make a request with cookies
                 # 发起带 cookie 的请求
                 cur_cookie = self.get_cookie(url)
-                r = requests.get(url, headers=self.get_header(cookie=cur_cookie, need_cookie=True))
+                r = self.session.get(url, headers=self.get_header(cookie=cur_cookie, need_cookie=True))
 
             # Handle verification if required
             # 如有需要，处理验证
-            return self.handle_verify(r=r, url=url, request_type=request_type)
+            return self.handle_verify(r=r, url=url, request_type=request_type, verify_round=verify_round)
 
         # For requests that can use a proxy
         # 对于可以使用代理的请求
@@ -151,23 +189,12 @@ class RequestsUtils():
             if self.ip_proxy:
                 # Attempt to make a request using a proxy
                 # 尝试使用代理发起请求
-                try:
-                    r = requests.get(
-                        url, 
-                        headers=self.get_header(cookie=None, need_cookie=False), 
-                        proxies=self.get_proxy(), 
-                        timeout=10
-                    )
-                except requests.RequestException as e:
-                    print(f'Proxy request failed: {e}')
-                    # 输出代理请求失败的信息
-                    return self.get_requests(url, request_type)  # Retry the request
-                    # 重试请求
+                r = self.get_with_proxy(url, headers=self.get_header(cookie=None, need_cookie=False))
             else:
                 # Fallback to making a request without a proxy
                 # 回退到不使用代理发起请求
-                r = requests.get(url, headers=self.get_header(cookie=None, need_cookie=False))
-            return self.handle_verify(r, url, request_type)
+                r = self.session.get(url, headers=self.get_header(cookie=None, need_cookie=False))
+            return self.handle_verify(r, url, request_type, verify_round)
 
         if request_type == 'proxy, cookie':
             # Implement anti-ban sleep for requests with cookies
@@ -180,53 +207,69 @@ class RequestsUtils():
             if self.ip_proxy:
                 # Make a request using a proxy and cookies
                 # 使用代理和 cookie 发起请求
-                try:
-                    r = requests.get(
-                        url, 
-                        headers=header, 
-                        proxies=self.get_proxy(), 
-                        timeout=10
-                    )
-                except requests.RequestException as e:
-                    print(f'Proxy request failed: {e}')
-                    # 输出代理请求失败的信息
-                    return self.get_requests(url, request_type)  # Retry the request
-                    # 重试请求
+                r = self.get_with_proxy(url, headers=header)
             else:
                 # Fallback to making a request without a proxy
                 # 回退到不使用代理发起请求
-                r = requests.get(url, headers=header)
+                r = self.session.get(url, headers=header)
 
-            return self.handle_verify(r, url, request_type)
+            return self.handle_verify(r, url, request_type, verify_round)
 
         # If an unsupported request_type is provided
         # 如果提供了不支持的 request_type
         raise AttributeError(f"Unsupported request_type: {request_type}")
         # 抛出属性错误
 
+    def get_with_proxy(self, url, headers):
+        """
+        Make a proxied GET request, switching to a new proxy with exponential backoff on failure.
+        使用代理发起 GET 请求，失败时以指数退避更换代理重试。
+
+        :param url: The URL to request.
+                    要请求的 URL。
+        :param headers: The request headers.
+                        请求头。
+        :return: The response object.
+                 响应对象。
+        :raises requests.RequestException: When every retry fails; callers must handle it.
+                                           所有重试均失败时抛出，调用方需要处理。
+        """
+        retry_time = self.get_retry_time()
+        for attempt in range(retry_time):
+            try:
+                return self.session.get(url, headers=headers, proxies=self.get_proxy(), timeout=10)
+            except requests.RequestException as e:
+                log.warning('Proxy request failed: %s', e)
+                # 输出代理请求失败的信息
+                if attempt == retry_time - 1:
+                    raise
+                # Back off before retrying with the next proxy
+                # 退避后使用下一个代理重试
+                time.sleep(min(30, 0.5 * 2 ** attempt) + random.random())
+
     def freeze_time(self):
         """
         Implement anti-ban sleep intervals based on the number of requests made.
+        The lock is held while sleeping, so every worker thread waits together.
         根据发起的请求数量实现防封禁的休眠间隔。
-        """
-        self.global_time += 1  # Increment the global request counter
-        # 增加全局请求计数器
-        if self.global_time != 1:
-            # Iterate over stop_times to check if a sleep interval should be implemented
-            # 遍历 stop_times 以检查是否需要实施休眠间隔
-            for each_stop_time in self.stop_times:
-                request_count, sleep_duration = int(each_stop_time[0]), int(each_stop_time[1])
-                if self.global_time % request_count == 0:
-                    # Sleep for the specified duration with slight randomization to mimic human behavior
-                    # 以指定的持续时间休眠，并略微随机化以模拟人类行为
-                    for _ in tqdm(range(sleep_duration), desc='Global Waiting'):
-                        import random
-                        sleep_time = 1 + (random.randint(1, 10) / 100)  # Sleep between 1.01 and 1.1 seconds
-                        time.sleep(sleep_time)
-                    break  # Only the highest priority sleep interval is applied per request
-                    # 每次请求仅应用最高优先级的休眠间隔
-
-    def handle_verify(self, r, url, request_type):
+        休眠期间持有锁，所有工作线程一同等待。
+        """
+        with self.lock:
+            self.global_time += 1  # Increment the global request counter
+            # 增加全局请求计数器
+            if self.global_time != 1:
+                # Iterate over stop_times to check if a sleep interval should be implemented
+                # 遍历 stop_times 以检查是否需要实施休眠间隔
+                for request_count, sleep_duration in self.stop_times:
+                    if self.global_time % request_count == 0:
+                        # Sleep for the specified duration with slight randomization to mimic human behavior
+                        # 以指定的持续时间休眠，并略微随机化以模拟人类行为
+                        log.info('Global Waiting: %ss', sleep_duration)
+                        time.sleep(sleep_duration * random.uniform(1.01, 1.10))  # Between 1.01x and 1.1x
+                        break  # Only the highest priority sleep interval is applied per request
+                        # 每次请求仅应用最高优先级的休眠间隔
+
+    def handle_verify(self, r, url, request_type, verify_round=None):
         """
         Handle verification (e.g., captcha) if the response indicates such a requirement.
         如果响应指示需要验证（例如验证码），则处理验证。
@@ -237,6 +280,8 @@ class RequestsUtils():
                     被请求的 URL。
         :param request_type: The type of request made.
                              发起的请求类型。
+        :param verify_round: The verification round when the request was sent.
+                             发起请求时的验证轮次。
         :return: The response object after handling verification.
                  处理验证后的响应对象。
         """
@@ -246,12 +291,21 @@ class RequestsUtils():
             # Decide whether to handle verification based on request_type and proxy usage
             # 根据 request_type 和代理使用情况决定是否处理验证
             if request_type != 'proxy, no cookie' or not spider_config.USE_PROXY:
-                print('Verification required. Please complete the verification and press Enter to continue:', r.url)
-                print('需要验证。请完成验证后按回车继续：', r.url)
-                input()
+                if verify_round is None:
+                    verify_round = self.verify_round
+                # Only one worker thread prompts; the others wait here, then retry once it is solved
+                # 只由一个工作线程提示验证，其他线程在此等待，验证完成后直接重试
+                with self.verify_lock:
+                    if self.verify_round == verify_round:
+                        # Interactive prompt, printed directly so log levels never hide it
+                        # 交互提示直接输出，不受日志级别影响
+                        print('Verification required. Please complete the verification and press Enter to continue:', r.url)
+                        print('需要验证。请完成验证后按回车继续：', r.url)
+                        input()
+                        self.verify_round += 1
             else:
-                print('Verification encountered, skipping handling due to proxy settings.')
-                print('遇到验证，由于代理设置，跳过处理。')
+                log.info('Verification encountered, skipping handling due to proxy settings.')
+                log.info('遇到验证，由于代理设置，跳过处理。')
             # Retry the request after handling verification
             # 处理验证后重试请求
             return self.get_requests(url, request_type)
@@ -287,38 +341,39 @@ class RequestsUtils():
         :return: The valid response object.
                  有效的响应对象。
         """
-        retry_time = self.get_retry_time()
-        while retry_time > 0:
-            retry_time -= 1
+        for _ in range(self.get_retry_time()):
             r = self.get_requests(url, request_type='proxy, no cookie')
             try:
                 # Parse the response as JSON
                 # 将响应解析为 JSON
                 r_json = json.loads(r.text)
-                if r_json.get('code') == 406:
-                    # Handle verification required on first proxy request (cold start)
-                    # 处理首次代理请求时需要验证的情况（冷启动）
-                    if cache.is_cold_start:
-                        print('Verification required. Please complete the verification and press Enter to continue:', r_json['customData']['verifyPageUrl'])
-                        print('需要验证。请完成验证后按回车继续：', r_json['customData']['verifyPageUrl'])
-                        input()
-                        r = self.get_requests(url, request_type='proxy, no cookie')
-                        cache.is_cold_start = False
-                if r_json.get('code') == 200:
-                    # Valid response received
-                    # 收到有效响应
-                    break
-                if retry_time <= 0:
-                    print('Please check your tsv and uuid, or the proxy quality may be low.')
-                    print('请检查您的 tsv 和 uuid，或者代理质量可能较低。')
-                    exit()
             except json.JSONDecodeError:
                 # Handle JSON parsing errors
                 # 处理 JSON 解析错误
-                print('JSON decoding failed. Retrying...')
-                print('JSON 解码失败。正在重试...')
-                pass
-        return r
+                log.warning('JSON decoding failed. Retrying...')
+                log.warning('JSON 解码失败。正在重试...')
+                continue
+
+            if r_json.get('code') == 200:
+                # Valid response received
+                # 收到有效响应
+                return r
+            if r_json.get('code') == 406 and cache.is_cold_start:
+                # Handle verification required on first proxy request (cold start)
+                # 处理首次代理请求时需要验证的情况（冷启动）
+                # Interactive prompt, printed directly so log levels never hide it
+                # 交互提示直接输出，不受日志级别影响
+                print('Verification required. Please complete the verification and press Enter to continue:', r_json['customData']['verifyPageUrl'])
+                print('需要验证。请完成验证后按回车继续：', r_json['customData']['verifyPageUrl'])
+                input()
+                cache.is_cold_start = False
+            # Any other response is retried with a fresh request
+            # 其他响应均重新发起请求
+            continue
+
+        log.error('Please check your tsv and uuid, or the proxy quality may be low.')
+        log.error('请检查您的 tsv 和 uuid，或者代理质量可能较低。')
+        exit()
 
     def get_cookie(self, url):
         """
@@ -351,11 +406,19 @@ class RequestsUtils():
         else:
             return 'search'
 
-    def get_header(self, cookie, need_cookie=True):
+    def build_headers(self):
         """
-        Construct the headers for a request.
-        构建请求的头部信息。
-        
+        Precompute the two headers used by most requests, with and without the default cookie.
+        预先构建大多数请求使用的两种请求头：带默认 cookie 和不带 cookie。
+        """
+        self._header_with_cookie = self.make_header(self.cookie, need_cookie=True)
+        self._header_no_cookie = self.make_header(None, need_cookie=False)
+
+    def make_header(self, cookie, need_cookie=True):
+        """
+        Construct a new header dictionary.
+        构建新的请求头字典。
+
         :param cookie: The cookie to include in the headers.
                        要包含在头部信息中的 cookie。
         :param need_cookie: Whether a cookie is required in the headers.
@@ -384,6 +447,25 @@ class RequestsUtils():
             }
         return header
 
+    def get_header(self, cookie, need_cookie=True):
+        """
+        Get the headers for a request. The common cases return shared precomputed
+        dictionaries, which callers must not modify.
+        获取请求的头部信息。常见情况直接返回预先构建的共享字典，调用方不可修改。
+        
+        :param cookie: The cookie to include in the headers.
+                       要包含在头部信息中的 cookie。
+        :param need_cookie: Whether a cookie is required in the headers.
+                            头部信息中是否需要包含 cookie。
+        :return: A dictionary of headers.
+                 包含头部信息的字典。
+        """
+        if not need_cookie:
+            return self._header_no_cookie
+        if cookie is None or cookie == self.cookie:
+            return self._header_with_cookie
+        return self.make_header(cookie, need_cookie=True)
+
     def get_proxy(self):
         """
         Retrieve a proxy to use for a request.
@@ -396,28 +478,30 @@ class RequestsUtils():
         # HTTP extraction mode
         # HTTP 提取模式
         if spider_config.HTTP_EXTRACT:
-            # If the proxy pool is empty, fetch new proxies
-            # 如果代理池为空，则获取新的代理
-            if len(self.proxy_pool) == 0:
-                proxy_url = spider_config.HTTP_LINK
-                try:
-                    r = requests.get(proxy_url)
-                    r_json = r.json()
-                    # Adjust parsing based on the structure of the JSON response
-                    # 根据 JSON 响应的结构调整解析方式
-                    for proxy in r_json:
+            # The pool is shared by worker threads, refill and pop under the lock
+            # 代理池由多个工作线程共享，补充和取出都需要加锁
+            with self.lock:
+                # If the proxy pool is empty, fetch new proxies
+                # 如果代理池为空，则获取新的代理
+                if not self.proxy_pool:
+                    proxy_url = spider_config.HTTP_LINK
+                    try:
+                        r = self.session.get(proxy_url)
+                        r_json = r.json()
+                        # Adjust parsing based on the structure of the JSON response
+                        # 根据 JSON 响应的结构调整解析方式
                         # Add each proxy multiple times based on repeat_nub for reuse
                         # 根据 repeat_nub 多次添加每个代理以便重复使用
-                        for _ in range(repeat_nub):
-                            self.proxy_pool.append([proxy['ip'], proxy['port']])
-                except requests.RequestException as e:
-                    print(f'Failed to fetch proxies: {e}')
-                    print(f'获取代理失败：{e}')
-                    sys.exit()
-
-            # Retrieve a proxy from the pool
-            # 从池中获取一个代理
-            ip, port = self.proxy_pool.pop(0)
+                        self.proxy_pool.extend((proxy['ip'], proxy['port'])
+                                               for proxy in r_json for _ in range(repeat_nub))
+                    except requests.RequestException as e:
+                        log.error('Failed to fetch proxies: %s', e)
+                        log.error('获取代理失败：%s', e)
+                        sys.exit()
+
+                # Retrieve a proxy from the pool
+                # 从池中获取一个代理
+                ip, port = self.proxy_pool.popleft()
             proxies = self.http_proxy_utils(ip, port)
             return proxies
 
@@ -428,8 +512,8 @@ class RequestsUtils():
             return proxies
 
         else:
-            print('When using proxies, you must choose either HTTP extraction or key extraction mode.')
-            print('使用代理时，必须选择 HTTP 提取或秘钥提取模式之一。')
+            log.error('When using proxies, you must choose either HTTP extraction or key extraction mode.')
+            log.error('使用代理时，必须选择 HTTP 提取或秘钥提取模式之一。')
             sys.exit()
         pass
 
@@ -467,6 +551,65 @@ class RequestsUtils():
         }
         return proxies
 
+    def get_replace_pattern(self, kind, font_id, font_path):
+        """
+        Build a compiled pattern matching every encrypted code of one font file, and the mapping
+        used to decrypt each match. Cached per page kind so every page is scanned only once per font.
+        为单个字体文件构建匹配所有加密代码的正则及对应的解密映射。按页面类型缓存，每个字体只需扫描页面一次。
+
+        :param kind: The page kind, one of 'search', 'review' or 'json'.
+                     页面类型，'search'、'review' 或 'json' 之一。
+        :param font_id: The font file identifier.
+                        字体文件标识符。
+        :param font_path: The path of the font mapping file.
+                          字体映射文件路径。
+        :return: A (compiled pattern, mapping) tuple.
+                 (编译后的正则, 映射字典) 元组。
+        """
+        cache_key = (kind, font_id, font_path)
+        cached = self._replace_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        mapping = {}
+        font_map = get_map(font_path)  # Retrieve character mappings from the font file
+        # 从字体文件中获取字符映射
+        for code_point, character in font_map.items():
+            entity = str(code_point).replace('uni', '&#x')
+            if kind == 'search':
+                mapping[f'"{font_id}">{entity};'] = f'"{font_id}">{character}'
+            elif kind == 'review':
+                mapping[f'"{code_point}"><'] = f'"{code_point}">{character}<'
+            else:
+                mapping[f'\\"{font_id}\\">{entity};'] = f'\\"{font_id}\\">{character}'
+        # Longest keys first so the alternation never stops at a shorter prefix
+        # 长的键优先，避免正则在较短的前缀处提前匹配
+        pattern = re.compile('|'.join(re.escape(key) for key in sorted(mapping, key=len, reverse=True)))
+        self._replace_cache[cache_key] = (pattern, mapping)
+        return pattern, mapping
+
+    def replace_by_file_map(self, kind, text, file_map):
+        """
+        Decrypt text by scanning it once per font file.
+        对每个字体文件只扫描一次文本，完成解密替换。
+
+        :param kind: The page kind, one of 'search', 'review' or 'json'.
+                     页面类型，'search'、'review' 或 'json' 之一。
+        :param text: The original content.
+                     原始内容。
+        :param file_map: A mapping of font file identifiers to file paths.
+                         字体文件标识符到文件路径的映射。
+        :return: The decrypted content.
+                 解密后的内容。
+        """
+        for font_id, font_path in file_map.items():
+            pattern, mapping = self.get_replace_pattern(kind, font_id, font_path)
+            if not mapping:
+                continue
+            text = pattern.sub(lambda m: mapping[m.group(0)], text)
+            # 替换加密代码为解密字符
+        return text
+
     def replace_search_html(self, page_source, file_map):
         """
         Replace encrypted codes in the HTML page source based on font file mappings for search pages.
@@ -479,16 +622,7 @@ class RequestsUtils():
         :return: The modified HTML content with decrypted text.
                  修改后的 HTML 内容，包含解密的文本。
         """
-        for font_id, font_path in file_map.items():
-            font_map = get_map(font_path)  # Retrieve character mappings from the font file
-            # 从字体文件中获取字符映射
-            for code_point, character in font_map.items():
-                key = str(code_point).replace('uni', '&#x')
-                key = f'"{font_id}">{key};'
-                value = f'"{font_id}">{character}'
-                page_source = page_source.replace(key, value)
-                # 替换加密代码为解密字符
-        return page_source
+        return self.replace_by_file_map('search', page_source, file_map)
 
     def replace_review_html(self, page_source, file_map):
         """
@@ -502,15 +636,7 @@ class RequestsUtils():
         :return: The modified HTML content with decrypted text.
                  修改后的 HTML 内容，包含解密的文本。
         """
-        for font_id, font_path in file_map.items():
-            font_map = get_map(font_path)
-            for code_point, character in font_map.items():
-                key = str(code_point).replace('uni', '&#x')
-                key = f'"{code_point}"><'
-                value = f'"{code_point}">{character}<'
-                page_source = page_source.replace(key, value)
-                # 替换加密代码为解密字符
-        return page_source
+        return self.replace_by_file_map('review', page_source, file_map)
 
     def replace_json_text(self, json_text, file_map):
         """
@@ -524,15 +650,7 @@ class RequestsUtils():
         :return: The modified JSON content with decrypted text.
                  修改后的 JSON 内容，包含解密的文本。
         """
-        for font_id, font_path in file_map.items():
-            font_map = get_map(font_path)
-            for code_point, character in font_map.items():
-                key = str(code_point).replace('uni', '&#x')
-                key = f'\\"{font_id}\\">{key};'
-                value = f'\\"{font_id}\\">{character}'
-                json_text = json_text.replace(key, value)
-                # 替换加密代码为解密字符
-        return json_text
+        return self.replace_by_file_map('json', json_text, file_map)
 
     def update_cookie(self):
         """
@@ -540,8 +658,9 @@ class RequestsUtils():
         从全局配置更新 cookie。
         """
         self.cookie = global_config.getRaw('config', 'Cookie')
-        print('Cookie has been updated from the global configuration.')
-        print('Cookie 已从全局配置中更新。')
+        self.build_headers()
+        log.info('Cookie has been updated from the global configuration.')
+        log.info('Cookie 已从全局配置中更新。')
 
 
 # Instantiate the RequestsUtils class for use
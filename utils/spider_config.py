@@ -35,6 +35,18 @@ class Config():
         self.REQUESTS_TIMES = global_config.getRaw('config', 'requests_times')
         self.UUID = global_config.getRaw('config', 'uuid')
         self.TCV = global_config.getRaw('config', 'tcv')
+        # 详情页并发数，旧的配置文件中没有该项时使用默认值
+        if global_config.has_option('config', 'concurrency'):
+            try:
+                self.CONCURRENCY = int(global_config.getRaw('config', 'concurrency'))
+            except ValueError:
+                print('concurrency 必须为整数')
+                exit()
+            if self.CONCURRENCY < 1:
+                print('concurrency 必须大于等于 1')
+                exit()
+        else:
+            self.CONCURRENCY = 10
 
         # config 的 detail
         self.KEYWORD = global_config.getRaw('detail', 'keyword')